@@ -1,6 +1,8 @@
 import requests
 import json
 import os
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 url = "https://api-inference.modelscope.cn/v1/chat/completions"
 # Using the key from the logs to inspect behavior (it was in the user provided logs)
@@ -24,6 +26,16 @@ try:
     # Clear proxies explicitly for this test script
     session = requests.Session()
     session.trust_env = False 
+    # Retry transient gateway errors over the same pooled connection
+    retry = Retry(
+        total=3,
+        backoff_factor=0.2,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"POST"}),
+        # Return the last 5xx response instead of raising, so it gets printed below
+        raise_on_status=False,
+    )
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=retry))
     
     response = session.post(url, headers=headers, json=data)
     print(f"Status Code: {response.status_code}")
@@ -8,13 +8,18 @@ This module provides:
 """
 
 import os
+import re
 import json
-import hashlib
-import random
-import string
+import tempfile
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional, Dict, List, Any
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
+
+try:
+    import orjson
+except ImportError:  # Optional speedup, fall back to stdlib json
+    orjson = None
 
 # Base directory for all data
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -24,6 +29,99 @@ PROFILES_DIR = os.path.join(DATA_DIR, "profiles")
 DEVICES_DIR = os.path.join(DATA_DIR, "devices")
 GLOBAL_SETTINGS_FILE = os.path.join(DATA_DIR, "settings.json")
 
+# Filesystem sanitizers. \w is Unicode-aware (alnum or "_"), matching str.isalnum()
+_PROFILE_UNSAFE_RE = re.compile(r"[^\w -]")
+_FOLDER_UNSAFE_RE = re.compile(r"\W")
+_FOLDER_TRANSLATE = str.maketrans({":": "_", "/": "_", "\\": "_", " ": "_", ".": "_"})
+
+
+def _json_loads(data: bytes) -> Any:
+    """Parse JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def read_json(path: str) -> Any:
+    """Read and parse a small JSON file straight from the fd, bypassing the io stack."""
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        remaining = os.fstat(fd).st_size
+        chunks = []
+        while remaining > 0:
+            chunk = os.read(fd, remaining)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+    finally:
+        os.close(fd)
+    return _json_loads(b"".join(chunks))
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """Serialize to pretty-printed UTF-8 JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _current_umask() -> int:
+    """Read the process umask (os.umask can only be read by setting it)."""
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# Read once at import, while still single-threaded; os.umask isn't thread-safe
+_NEW_FILE_MODE = 0o666 & ~_current_umask()
+
+
+def atomic_write(path: str, data: bytes, durable: bool = False) -> None:
+    """Write bytes to path atomically via a temp file and os.replace.
+
+    os.replace alone guarantees readers never see a torn file; durable=True
+    additionally fsyncs so the new content survives a power loss. The file
+    keeps its existing permissions (or gets the umask default if it is new),
+    since mkstemp creates temp files as 0600.
+    """
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = _NEW_FILE_MODE
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        # fdopen's write loops over short writes (e.g. ENOSPC) and raises on failure
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_json(path: str, obj: Any, durable: bool = False) -> None:
+    """Serialize obj and write it to path atomically."""
+    atomic_write(path, _json_dumps(obj), durable=durable)
+
+
+@lru_cache(maxsize=None)
+def _field_names(cls: type) -> tuple:
+    """Field names of a dataclass, computed once per class."""
+    return tuple(f.name for f in fields(cls))
+
+
+def _shallow_asdict(obj: Any) -> dict:
+    """Faster asdict() for flat dataclasses whose fields are plain values."""
+    return {name: getattr(obj, name) for name in _field_names(type(obj))}
+
 
 def ensure_directories():
     """Ensure all required directories exist."""
@@ -35,7 +133,7 @@ def ensure_directories():
 # Profile Management
 # ============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class ModelConfig:
     """Model configuration for cloud or local."""
     base_url: str = ""
@@ -43,7 +141,7 @@ class ModelConfig:
     api_key: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentConfig:
     """Agent behavior configuration."""
     max_steps: int = 100
@@ -51,7 +149,7 @@ class AgentConfig:
     verbose: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class Profile:
     """Complete profile configuration."""
     name: str
@@ -63,20 +161,13 @@ class Profile:
     conversation_prefix: str = ""
 
     def __post_init__(self):
-        if self.cloud is None:
-            self.cloud = ModelConfig()
-        if self.local is None:
-            self.local = ModelConfig()
-        if self.agent is None:
-            self.agent = AgentConfig()
-        
-        # Convert dicts to dataclasses if needed
-        if isinstance(self.cloud, dict):
-            self.cloud = ModelConfig(**self.cloud)
-        if isinstance(self.local, dict):
-            self.local = ModelConfig(**self.local)
-        if isinstance(self.agent, dict):
-            self.agent = AgentConfig(**self.agent)
+        # Accept dataclasses as-is; build from dicts (loaded JSON) or defaults (None)
+        if not isinstance(self.cloud, ModelConfig):
+            self.cloud = ModelConfig(**self.cloud) if self.cloud else ModelConfig()
+        if not isinstance(self.local, ModelConfig):
+            self.local = ModelConfig(**self.local) if self.local else ModelConfig()
+        if not isinstance(self.agent, AgentConfig):
+            self.agent = AgentConfig(**self.agent) if self.agent else AgentConfig()
 
     def to_dict(self) -> dict:
         """Convert profile to dictionary for JSON serialization."""
@@ -84,9 +175,9 @@ class Profile:
             "name": self.name,
             "created_at": self.created_at,
             "mode": self.mode,
-            "cloud": asdict(self.cloud) if self.cloud else {},
-            "local": asdict(self.local) if self.local else {},
-            "agent": asdict(self.agent) if self.agent else {},
+            "cloud": _shallow_asdict(self.cloud) if self.cloud else {},
+            "local": _shallow_asdict(self.local) if self.local else {},
+            "agent": _shallow_asdict(self.agent) if self.agent else {},
             "conversation_prefix": self.conversation_prefix
         }
 
@@ -109,6 +200,12 @@ class ProfileManager:
 
     def __init__(self):
         ensure_directories()
+        # Parsed profile data keyed by file path: {path: (st_mtime_ns, data)}
+        self._cache: Dict[str, tuple[int, dict]] = {}
+        # Profile name -> file path, refreshed on every directory scan
+        self._name_index: Dict[str, str] = {}
+        # Shared read-only Profile per file path, valid while its parsed dict is current
+        self._profiles: Dict[str, tuple[dict, Profile]] = {}
         self._ensure_default_profile()
 
     def _ensure_default_profile(self):
@@ -119,40 +216,87 @@ class ProfileManager:
     def _get_profile_path(self, name: str) -> str:
         """Get file path for a profile."""
         # Sanitize name for filesystem
-        safe_name = "".join(c if c.isalnum() or c in "_ -" else "_" for c in name)
+        safe_name = _PROFILE_UNSAFE_RE.sub("_", name)
         return os.path.join(PROFILES_DIR, f"{safe_name}.json")
 
+    def _load_file(self, path: str, mtime_ns: int) -> dict:
+        """Load profile data, reusing the cached parse if the file is unchanged."""
+        cached = self._cache.get(path)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        data = read_json(path)
+        self._cache[path] = (mtime_ns, data)
+        return data
+
+    def _scan_profiles(self):
+        """Yield (path, data) for every profile file; data is None if unreadable."""
+        if not os.path.exists(PROFILES_DIR):
+            return
+        with os.scandir(PROFILES_DIR) as it:
+            for entry in it:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    data = self._load_file(entry.path, entry.stat().st_mtime_ns)
+                except (json.JSONDecodeError, IOError):
+                    self._cache.pop(entry.path, None)
+                    yield entry.path, None
+                    continue
+                if "name" in data:
+                    self._name_index[data["name"]] = entry.path
+                yield entry.path, data
+
+    def _find_profile(self, name: str) -> tuple[Optional[str], Optional[dict]]:
+        """Locate a profile file by name, trying the name index before a full scan."""
+        path = self._name_index.get(name)
+        if path is not None:
+            try:
+                data = self._load_file(path, os.stat(path).st_mtime_ns)
+                if data.get("name") == name:
+                    return path, data
+            except (json.JSONDecodeError, IOError):
+                pass
+            # Stale entry (file renamed, removed or edited externally)
+            self._name_index.pop(name, None)
+
+        for path, data in self._scan_profiles():
+            if data is not None and data.get("name") == name:
+                return path, data
+        return None, None
+
     def list_profiles(self) -> List[str]:
         """List all profile names."""
         profiles = []
-        if os.path.exists(PROFILES_DIR):
-            for f in os.listdir(PROFILES_DIR):
-                if f.endswith(".json"):
-                    try:
-                        with open(os.path.join(PROFILES_DIR, f), "r", encoding="utf-8") as file:
-                            data = json.load(file)
-                            profiles.append(data.get("name", f[:-5]))
-                    except (json.JSONDecodeError, IOError) as e:
-                        # Fallback to filename if JSON is corrupted
-                        profiles.append(f[:-5])
+        for path, data in self._scan_profiles():
+            if data is None:
+                # Fallback to filename if JSON is corrupted
+                profiles.append(os.path.basename(path)[:-5])
+            else:
+                profiles.append(data.get("name", os.path.basename(path)[:-5]))
         return profiles
 
     def get_profile(self, name: str) -> Optional[Profile]:
         """Get a profile by name."""
-        # Search for profile by name in all files
-        if os.path.exists(PROFILES_DIR):
-            for f in os.listdir(PROFILES_DIR):
-                if f.endswith(".json"):
-                    path = os.path.join(PROFILES_DIR, f)
-                    try:
-                        with open(path, "r", encoding="utf-8") as file:
-                            data = json.load(file)
-                            if data.get("name") == name:
-                                return Profile.from_dict(data)
-                    except (json.JSONDecodeError, IOError):
-                        continue
+        _, data = self._find_profile(name)
+        if data is not None:
+            return Profile.from_dict(data)
         return None
 
+    def get_profile_cached(self, name: str) -> Optional[Profile]:
+        """Get a shared Profile that is rebuilt only when its file changes.
+
+        The returned object must not be modified; use get_profile() for edits.
+        """
+        path, data = self._find_profile(name)
+        if data is None:
+            return None
+        cached = self._profiles.get(path)
+        if cached is not None and cached[0] is data:
+            return cached[1]
+        profile = Profile.from_dict(data)
+        self._profiles[path] = (data, profile)
+        return profile
+
     def create_profile(self, name: str) -> Profile:
         """Create a new profile with given name."""
         if self.get_profile(name):
@@ -184,31 +328,31 @@ class ProfileManager:
         return profile
 
     def save_profile(self, profile: Profile) -> None:
-        """Save a profile to disk."""
+        """Save a profile to disk, skipping the write if the file already matches."""
         path = self._get_profile_path(profile.name)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(profile.to_dict(), f, ensure_ascii=False, indent=2)
+        data = profile.to_dict()
+        self._name_index[profile.name] = path
+        cached = self._cache.get(path)
+        if cached is not None and cached[1] == data:
+            try:
+                if os.stat(path).st_mtime_ns == cached[0]:
+                    return
+            except OSError:
+                pass
+        self._cache.pop(path, None)
+        atomic_write_json(path, data, durable=True)
+        self._cache[path] = (os.stat(path).st_mtime_ns, data)
 
     def delete_profile(self, name: str) -> bool:
         """Delete a profile by name."""
-        target_path = None
-        
         # Find the profile file
-        if os.path.exists(PROFILES_DIR):
-            for f in os.listdir(PROFILES_DIR):
-                if f.endswith(".json"):
-                    path = os.path.join(PROFILES_DIR, f)
-                    try:
-                        with open(path, "r", encoding="utf-8") as file:
-                            data = json.load(file)
-                            if data.get("name") == name:
-                                target_path = path
-                                break
-                    except (json.JSONDecodeError, IOError):
-                        continue
+        target_path, _ = self._find_profile(name)
         
         # Delete file if found (outside resource context to avoid lock issues)
         if target_path:
+            self._cache.pop(target_path, None)
+            self._profiles.pop(target_path, None)
+            self._name_index.pop(name, None)
             try:
                 os.remove(target_path)
                 return True
@@ -219,16 +363,23 @@ class ProfileManager:
 
     def rename_profile(self, old_name: str, new_name: str) -> bool:
         """Rename a profile."""
-        profile = self.get_profile(old_name)
-        if not profile:
+        old_path, data = self._find_profile(old_name)
+        if data is None:
             return False
-        if self.get_profile(new_name):
+        if self._find_profile(new_name)[0] is not None:
             raise ValueError(f"Profile '{new_name}' already exists")
 
-        # Delete old file and save with new name
-        self.delete_profile(old_name)
+        # Save under the new name first, then drop the old file if the path changed
+        profile = Profile.from_dict(data)
         profile.name = new_name
         self.save_profile(profile)
+        self._name_index.pop(old_name, None)
+        if old_path != self._get_profile_path(new_name):
+            self._cache.pop(old_path, None)
+            try:
+                os.remove(old_path)
+            except OSError as e:
+                print(f"Error deleting profile file {old_path}: {e}")
         return True
 
 
@@ -236,7 +387,7 @@ class ProfileManager:
 # Device Data Management
 # ============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class DeviceInfo:
     """Device information retrieved from ADB."""
     device_id: str  # IP or Serial
@@ -253,7 +404,21 @@ class DeviceInfo:
     last_seen: str = ""
 
     def to_dict(self) -> dict:
-        return asdict(self)
+        return _shallow_asdict(self)
+
+
+# Field names accepted by DeviceInfo, used to filter keys loaded from disk
+_DEVICE_INFO_FIELDS = frozenset(DeviceInfo.__annotations__)
+
+
+@lru_cache(maxsize=256)
+def _folder_name_for(text: str) -> str:
+    """Convert text to safe folder name (pure, so memoized per process)."""
+    # Replace special characters
+    safe = text.translate(_FOLDER_TRANSLATE)
+    # Remove any remaining unsafe characters
+    safe = _FOLDER_UNSAFE_RE.sub("", safe)
+    return safe[:50]  # Limit length
 
 
 class DeviceDataManager:
@@ -261,44 +426,68 @@ class DeviceDataManager:
 
     def __init__(self):
         ensure_directories()
+        # Folder names whose directory tree has already been created this process
+        self._ensured: set[str] = set()
+        # Parsed .device files keyed by path: {path: (st_mtime_ns, data)}
+        self._meta_cache: Dict[str, tuple[int, dict]] = {}
+        # Per-folder file paths, joined once: {folder_name: {key: path}}
+        self._paths: Dict[str, Dict[str, str]] = {}
+        # Saved device_id -> android_id map, rebuilt when DEVICES_DIR or our metadata changes
+        self._reverse_map: Optional[Dict[str, str]] = None
+        self._reverse_map_mtime: Optional[int] = None
+
+    def _folder_paths(self, folder_name: str) -> Dict[str, str]:
+        """Get the precomputed data file paths for a device folder."""
+        paths = self._paths.get(folder_name)
+        if paths is None:
+            root = os.path.join(DEVICES_DIR, folder_name)
+            paths = {
+                "root": root,
+                "metadata": os.path.join(root, ".device"),
+                "profile_name": os.path.join(root, "profile_name.txt"),
+                "chat_history": os.path.join(root, "chat_history.json"),
+                "screenshots_dir": os.path.join(root, "screenshots"),
+                "logs_dir": os.path.join(root, "logs"),
+            }
+            self._paths[folder_name] = paths
+        return paths
 
     def _sanitize_for_folder(self, text: str) -> str:
         """Convert text to safe folder name."""
-        # Replace special characters
-        safe = text.replace(":", "_").replace("/", "_").replace("\\", "_")
-        safe = safe.replace(" ", "_").replace(".", "_")
-        # Remove any remaining unsafe characters
-        safe = "".join(c if c.isalnum() or c == "_" else "" for c in safe)
-        return safe[:50]  # Limit length
+        return _folder_name_for(text)
 
     def get_device_folder_name(self, android_id: str) -> str:
         """
         Get folder name for a device based on Android ID.
         Folder name IS the sanitized Android ID.
         """
-        return self._sanitize_for_folder(android_id)
+        return _folder_name_for(android_id)
 
     def ensure_device_folder(self, android_id: str) -> str:
         """Ensure folder exists for the given Android ID."""
         folder_name = self.get_device_folder_name(android_id)
-        folder_path = os.path.join(DEVICES_DIR, folder_name)
+        if folder_name in self._ensured:
+            return folder_name
+        paths = self._folder_paths(folder_name)
         
-        os.makedirs(folder_path, exist_ok=True)
-        os.makedirs(os.path.join(folder_path, "screenshots"), exist_ok=True)
-        os.makedirs(os.path.join(folder_path, "logs"), exist_ok=True)
+        os.makedirs(paths["root"], exist_ok=True)
+        os.makedirs(paths["screenshots_dir"], exist_ok=True)
+        os.makedirs(paths["logs_dir"], exist_ok=True)
+        self._ensured.add(folder_name)
         return folder_name
 
     def save_device_metadata(self, android_id: str, info: DeviceInfo) -> None:
         """Save device metadata to .device file."""
         folder_name = self.ensure_device_folder(android_id)
-        path = os.path.join(DEVICES_DIR, folder_name, ".device")
+        path = self._folder_paths(folder_name)["metadata"]
         
         # Update last seen
         info.last_seen = datetime.now().isoformat()
         
+        self._meta_cache.pop(path, None)
+        self._reverse_map = None
         try:
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(info.to_dict(), f, ensure_ascii=False, indent=2)
+            atomic_write_json(path, info.to_dict(), durable=True)
         except Exception as e:
             print(f"Error saving device metadata: {e}")
 
@@ -308,67 +497,90 @@ class DeviceDataManager:
         data = self.get_device_metadata(folder)
         if data:
             # Filter keys to match DeviceInfo fields
-            valid_keys = DeviceInfo.__annotations__.keys()
-            filtered_data = {k: v for k, v in data.items() if k in valid_keys}
+            filtered_data = {k: v for k, v in data.items() if k in _DEVICE_INFO_FIELDS}
             return DeviceInfo(**filtered_data)
         return None
 
     def get_device_metadata(self, folder_name: str) -> Optional[dict]:
         """Load device metadata from folder."""
-        path = os.path.join(DEVICES_DIR, folder_name, ".device")
-        if os.path.exists(path):
-            try:
-                with open(path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"Warning: Failed to load device metadata: {e}")
-                return None
-        return None
+        path = self._folder_paths(folder_name)["metadata"]
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            cached = self._meta_cache.get(path)
+            if cached is None or cached[0] != mtime_ns:
+                cached = (mtime_ns, read_json(path))
+                self._meta_cache[path] = cached
+            # Callers annotate the returned dict, so hand out a copy
+            return dict(cached[1])
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Warning: Failed to load device metadata: {e}")
+            return None
 
     def list_known_devices(self) -> List[dict]:
         """List all known devices from disk."""
-        devices = []
         if not os.path.exists(DEVICES_DIR):
             return []
             
-        for folder in os.listdir(DEVICES_DIR):
-            if os.path.isdir(os.path.join(DEVICES_DIR, folder)):
-                meta = self.get_device_metadata(folder)
-                if meta:
-                    devices.append(meta)
-        return devices
+        # scandir reuses the directory listing's d_type instead of stat'ing each entry
+        with os.scandir(DEVICES_DIR) as it:
+            folders = [entry.name for entry in it if entry.is_dir(follow_symlinks=False)]
+
+        # Serial on purpose: metadata is mtime-cached, so each load is a stat and a
+        # dict copy, far cheaper than spinning up a thread pool per call
+        metas = [self.get_device_metadata(folder) for folder in folders]
+
+        return [meta for meta in metas if meta]
+
+    def find_android_id(self, device_id: str) -> Optional[str]:
+        """Look up the Android ID last saved for a device_id (IP/serial), without ADB."""
+        try:
+            mtime_ns = os.stat(DEVICES_DIR).st_mtime_ns
+        except OSError:
+            return None
+        if self._reverse_map is None or mtime_ns != self._reverse_map_mtime:
+            self._reverse_map = {
+                meta["device_id"]: meta["android_id"]
+                for meta in self.list_known_devices()
+                if meta.get("device_id") and meta.get("android_id")
+            }
+            self._reverse_map_mtime = mtime_ns
+        return self._reverse_map.get(device_id)
 
     def get_profile_name(self, android_id: str) -> Optional[str]:
         """Get assigned profile name."""
         try:
             folder = self.get_device_folder_name(android_id)
-            path = os.path.join(DEVICES_DIR, folder, "profile_name.txt")
-            if os.path.exists(path):
-                with open(path, "r", encoding="utf-8") as f:
-                    return f.read().strip()
+            path = self._folder_paths(folder)["profile_name"]
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            pass
         except (IOError, OSError) as e:
             print(f"Warning: Failed to read profile name: {e}")
             pass
         return None
 
     def set_profile_name(self, android_id: str, profile_name: str) -> None:
-        """Set assigned profile name."""
+        """Set assigned profile name, skipping the write if it is already assigned."""
+        if self.get_profile_name(android_id) == profile_name:
+            return
         folder = self.ensure_device_folder(android_id)
-        path = os.path.join(DEVICES_DIR, folder, "profile_name.txt")
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(profile_name)
+        path = self._folder_paths(folder)["profile_name"]
+        atomic_write(path, profile_name.encode("utf-8"))
 
     # Path Helpers (Require Android ID now)
     def get_chat_history_path(self, android_id: str) -> str:
         folder = self.get_device_folder_name(android_id)
-        return os.path.join(DEVICES_DIR, folder, "chat_history.json")
+        return self._folder_paths(folder)["chat_history"]
 
 
 # ============================================================================
 # Global Settings Management
 # ============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class GlobalSettings:
     """Simplified global settings."""
     last_selected_device: str = ""
@@ -377,7 +589,7 @@ class GlobalSettings:
     manual_screenshot_path: str = ""
 
     def to_dict(self) -> dict:
-        return asdict(self)
+        return _shallow_asdict(self)
 
     @classmethod
     def from_dict(cls, data: dict) -> "GlobalSettings":
@@ -395,26 +607,45 @@ class GlobalSettingsManager:
     def __init__(self):
         ensure_directories()
         self._settings: Optional[GlobalSettings] = None
+        # mtime of the file behind self._settings, and the bytes last written/read
+        self._mtime_ns: Optional[int] = None
+        self._last_bytes: Optional[bytes] = None
 
     def load(self) -> GlobalSettings:
-        """Load global settings from file."""
-        if os.path.exists(GLOBAL_SETTINGS_FILE):
-            try:
-                with open(GLOBAL_SETTINGS_FILE, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    self._settings = GlobalSettings.from_dict(data)
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"Warning: Failed to load global settings: {e}")
-                self._settings = GlobalSettings()
-        else:
+        """Load global settings from file, skipping the parse if it is unchanged."""
+        try:
+            mtime_ns = os.stat(GLOBAL_SETTINGS_FILE).st_mtime_ns
+            if self._settings is not None and mtime_ns == self._mtime_ns:
+                return self._settings
+            data = read_json(GLOBAL_SETTINGS_FILE)
+            self._settings = GlobalSettings.from_dict(data)
+            self._mtime_ns = mtime_ns
+            self._last_bytes = _json_dumps(self._settings.to_dict())
+        except FileNotFoundError:
+            self._settings = GlobalSettings()
+            self._mtime_ns = self._last_bytes = None
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Warning: Failed to load global settings: {e}")
             self._settings = GlobalSettings()
+            self._mtime_ns = self._last_bytes = None
         return self._settings
 
     def save(self, settings: GlobalSettings) -> None:
-        """Save global settings to file."""
+        """Save global settings to file, skipping the write if nothing changed."""
         self._settings = settings
-        with open(GLOBAL_SETTINGS_FILE, "w", encoding="utf-8") as f:
-            json.dump(settings.to_dict(), f, ensure_ascii=False, indent=2)
+        new_bytes = _json_dumps(settings.to_dict())
+        if new_bytes == self._last_bytes and self._file_unchanged():
+            return
+        atomic_write(GLOBAL_SETTINGS_FILE, new_bytes)
+        self._last_bytes = new_bytes
+        self._mtime_ns = os.stat(GLOBAL_SETTINGS_FILE).st_mtime_ns
+
+    def _file_unchanged(self) -> bool:
+        """Check the settings file is still the one we last read or wrote."""
+        try:
+            return os.stat(GLOBAL_SETTINGS_FILE).st_mtime_ns == self._mtime_ns
+        except OSError:
+            return False
 
     def get(self) -> GlobalSettings:
         """Get current settings, loading if needed."""
@@ -422,6 +653,13 @@ class GlobalSettingsManager:
             self.load()
         return self._settings
 
+    def get_json(self) -> bytes:
+        """Get current settings as JSON bytes, reusing the last read/written encoding."""
+        settings = self.get()
+        if self._last_bytes is None:
+            return _json_dumps(settings.to_dict())
+        return self._last_bytes
+
     def update_last_device(self, device_id: str) -> None:
         """Update the last selected device."""
         settings = self.get()
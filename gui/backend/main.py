@@ -1,19 +1,30 @@
 import sys
 import os
 import asyncio
+import base64
 import io
 import contextlib
 import logging
-from typing import List, Optional
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Optional
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
 import json
+import subprocess
 import threading
-import queue
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timedelta
 from fastapi.staticfiles import StaticFiles
 
+try:
+    import orjson
+except ImportError:  # Optional speedup, fall back to stdlib json
+    orjson = None
+
 # Setup paths (Must be defined before usage)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, "../../"))
@@ -21,19 +32,36 @@ PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, "../../"))
 # Add project root to sys.path
 sys.path.append(PROJECT_ROOT)
 
-from phone_agent.device_factory import DeviceType
+from phone_agent.device_factory import DeviceType, get_device_factory
 from phone_agent.config.apps import list_supported_apps
 from phone_agent.config.apps_harmonyos import list_supported_apps as list_harmonyos_apps
 from phone_agent.config.apps_ios import list_supported_apps as list_ios_apps
-from phone_agent.agent import PhoneAgent, AgentConfig, StepResult
-from phone_agent.model import ModelConfig
+from gui.backend.data_manager import (
+    get_profile_manager, get_device_data_manager, get_global_settings_manager,
+    Profile, GlobalSettings, DeviceInfo, DEVICES_DIR, atomic_write_json, read_json
+)
+
+# The agent and model client pull in openai and friends; they are imported on
+# first use so the server can bind and serve device/settings endpoints sooner.
+if TYPE_CHECKING:
+    from phone_agent.agent import PhoneAgent
 
-app = FastAPI()
+from fastapi.responses import JSONResponse, Response
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that renders with orjson when it is installed."""
+
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+# Polled endpoints (/api/status, /api/devices, ...) return plain dicts; encode them with orjson when available
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # Mount device data directory for static access (screenshots)
-device_data_root = os.path.join(PROJECT_ROOT, "data", "devices")
-os.makedirs(device_data_root, exist_ok=True)
-app.mount("/devices_data", StaticFiles(directory=device_data_root), name="devices_data")
+os.makedirs(DEVICES_DIR, exist_ok=True)
+app.mount("/devices_data", StaticFiles(directory=DEVICES_DIR), name="devices_data")
 
 # Filter out successful access logs to reduce noise
 class EndpointFilter(logging.Filter):
@@ -61,14 +89,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-from fastapi.responses import FileResponse
+
+def _load_favicon() -> Optional[bytes]:
+    try:
+        with open(os.path.join(PROJECT_ROOT, "logo.jpg"), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+# Read once; browsers request the favicon on every page load
+_FAVICON = _load_favicon()
 
 @app.get("/favicon.ico", include_in_schema=False)
 async def favicon():
-    logo_path = os.path.join(os.path.dirname(__file__), "../../logo.jpg")
-    if os.path.exists(logo_path):
-        return FileResponse(logo_path)
-    return FastAPI.Response(status_code=204)
+    if _FAVICON is None:
+        return Response(status_code=204)
+    return Response(
+        _FAVICON,
+        media_type="image/jpeg",
+        headers={"Cache-Control": "public, max-age=86400"},
+    )
 
 # Models
 class ChatRequest(BaseModel):
@@ -94,12 +134,37 @@ class Settings(BaseModel):
     conversation_prefix: Optional[str] = None
 
 # Global State
-agent: Optional[PhoneAgent] = None
-log_queue = queue.Queue()
-
-# Global State
-agent: Optional[PhoneAgent] = None
-log_queue = queue.Queue()
+agent: Optional["PhoneAgent"] = None
+LOG_QUEUE_MAXSIZE = 10_000  # Oldest lines are dropped beyond this if broadcasting falls behind
+LOG_BATCH_MAX = 256  # Max lines per broadcast frame, so a burst can't monopolize the loop
+log_queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=LOG_QUEUE_MAXSIZE)
+_log_loop: Optional[asyncio.AbstractEventLoop] = None  # Set once log_broadcaster starts
+# Lines logged before the event loop was running
+_pending_logs: deque[str] = deque(maxlen=LOG_QUEUE_MAXSIZE)
+# Guards the handoff from _pending_logs to the loop so no early line is stranded
+_log_loop_lock = threading.Lock()
+
+def _enqueue_log(line: str):
+    """Put a line on log_queue, dropping the oldest one if it is full. Runs on the loop."""
+    if log_queue.full():
+        log_queue.get_nowait()
+    log_queue.put_nowait(line)
+
+def publish_log(line: str):
+    """Queue a log line for WebSocket broadcast. Safe to call from any thread."""
+    loop = _log_loop
+    if loop is None:
+        with _log_loop_lock:
+            loop = _log_loop
+            if loop is None:
+                _pending_logs.append(line)
+                return
+    # Always go through call_soon_threadsafe, even on the loop thread, so lines
+    # keep the order in which they were published across threads
+    try:
+        loop.call_soon_threadsafe(_enqueue_log, line)
+    except RuntimeError:
+        pass  # Event loop already closed (shutdown)
 
 # Cache for IP -> Android ID mapping (for fast resolution)
 DEVICE_IP_TO_ANDROID_ID = {}
@@ -115,36 +180,20 @@ def resolve_android_id(device_identifier: str) -> Optional[str]:
     if aid: return aid
     
     # 2. Check if the identifier itself is a known Android ID (folder exists)
-    try:
-        from gui.backend.data_manager import get_device_data_manager, PROJECT_ROOT
-        dm = get_device_data_manager()
-        potential_folder = dm.get_device_folder_name(device_identifier)
-        if os.path.exists(os.path.join(PROJECT_ROOT, "data", "devices", potential_folder)):
-            return device_identifier
-    except:
-        pass
+    dm = get_device_data_manager()
+    potential_folder = dm.get_device_folder_name(device_identifier)
+    if os.path.exists(os.path.join(DEVICES_DIR, potential_folder)):
+        return device_identifier
 
-    # 3. NEW: Reverse lookup from saved device metadata (.device files)
-    # This handles the case where device was previously connected but cache is empty
+    # 3. Reverse lookup from saved device metadata (.device files)
+    # This handles the case where device was previously connected but cache is empty;
+    # the data manager keeps the scanned map until the devices directory changes
     try:
-        from gui.backend.data_manager import get_device_data_manager, PROJECT_ROOT
-        devices_dir = os.path.join(PROJECT_ROOT, "data", "devices")
-        if os.path.exists(devices_dir):
-            for folder in os.listdir(devices_dir):
-                device_file = os.path.join(devices_dir, folder, ".device")
-                if os.path.exists(device_file):
-                    try:
-                        with open(device_file, "r", encoding="utf-8") as f:
-                            meta = json.load(f)
-                            # Check if device_id matches
-                            if meta.get("device_id") == device_identifier:
-                                aid = meta.get("android_id")
-                                if aid:
-                                    # Update cache for future lookups
-                                    DEVICE_IP_TO_ANDROID_ID[device_identifier] = aid
-                                    return aid
-                    except:
-                        continue
+        aid = dm.find_android_id(device_identifier)
+        if aid:
+            # Update cache for future lookups
+            DEVICE_IP_TO_ANDROID_ID[device_identifier] = aid
+            return aid
     except Exception as e:
         print(f"DEBUG: Metadata lookup failed: {e}")
 
@@ -166,21 +215,27 @@ class OutputTee(io.StringIO):
     def __init__(self, original_stdout):
         super().__init__()
         self.original_stdout = original_stdout
-        self.buffer = ""
-        self.io_lock = threading.Lock()
+        # Partial (unterminated) line fragments per writing thread, so writers
+        # never contend on a lock or interleave each other's lines
+        self._local = threading.local()
 
     def write(self, s):
         # Always write to original stdout immediately (console sees streaming)
         self.original_stdout.write(s)
         
         # Buffer for WebSocket logs to ensure line-by-line transmission
-        with self.io_lock:
-            self.buffer += s
-            while '\n' in self.buffer:
-                line, self.buffer = self.buffer.split('\n', 1)
-                # Only broadcast non-empty lines to keep UI clean
-                if line.strip():
-                     log_queue.put(line)
+        parts = self._local.__dict__.setdefault("parts", [])
+        parts.append(s)
+        if '\n' not in s:
+            return
+        lines = "".join(parts).split('\n')
+        parts.clear()
+        if lines[-1]:
+            parts.append(lines[-1])
+        for line in lines[:-1]:
+            # Only broadcast non-empty lines to keep UI clean
+            if line.strip():
+                publish_log(line)
 
     def flush(self):
         self.original_stdout.flush()
@@ -189,104 +244,174 @@ sys.stdout = OutputTee(sys.stdout)
 # sys.stderr = OutputTee(sys.stderr) # Optionally capture stderr too
 
 # WebSocket Manager with device-based filtering
+WS_HEARTBEAT_INTERVAL = 30  # seconds between keepalive frames on /ws/logs
+BROADCAST_BATCH_SIZE = 50  # max concurrent sends before yielding to the event loop
+
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: set[WebSocket] = set()
         self.connection_device_map: dict[WebSocket, Optional[str]] = {}  # Map connection to device_id
-        self.log_history: List[tuple[str, Optional[str]]] = []  # (message, device_id)
         self.max_history = 2000
+        # Ring buffer of (message, device_id); oldest entries drop off in O(1)
+        self.log_history: deque[tuple[str, Optional[str]]] = deque(maxlen=self.max_history)
 
     async def connect(self, websocket: WebSocket, device_id: Optional[str] = None):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
         self.connection_device_map[websocket] = device_id
-        # Replay history (filter by device_id if specified)
-        for log_msg, log_device_id in self.log_history:
-            try:
-                # Send if: no device filter OR log has no device OR devices match
-                if device_id is None or log_device_id is None or log_device_id == device_id:
-                    await websocket.send_text(log_msg)
-            except Exception:
-                pass  # Skip if websocket send fails
+        # Replay history (filter by device_id if specified) as a single frame
+        replay = "\n".join(
+            log_msg for log_msg, log_device_id in self.log_history
+            # Send if: no device filter OR log has no device OR devices match
+            if device_id is None or log_device_id is None or log_device_id == device_id
+        )
+        if not replay:
+            return
+        try:
+            await websocket.send_text(replay)
+        except Exception:
+            self.disconnect(websocket)  # Client went away during replay; stop tracking it
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        if websocket in self.connection_device_map:
-            del self.connection_device_map[websocket]
+        self.active_connections.discard(websocket)
+        self.connection_device_map.pop(websocket, None)
 
     async def broadcast(self, message: str, device_id: Optional[str] = None):
+        await self.broadcast_batch([(message, device_id)])
+
+    async def broadcast_batch(self, entries: List[tuple[str, Optional[str]]]):
+        """Broadcast several (message, device_id) log entries, one frame per connection.
+
+        Messages in a frame are joined with newlines; the frontend splits them.
+        """
         # Add to history with device_id tag
-        self.log_history.append((message, device_id))
-        if len(self.log_history) > self.max_history:
-            self.log_history.pop(0)
+        self.log_history.extend(entries)
         
-        for connection in self.active_connections:
-            try:
-                conn_device_id = self.connection_device_map.get(connection)
+        # Clients sharing a device filter get the same frame, so build each one once
+        frames: dict[Optional[str], str] = {}
+        pending = []
+        for connection in tuple(self.active_connections):
+            conn_device_id = self.connection_device_map.get(connection)
+            frame = frames.get(conn_device_id)
+            if frame is None:
                 # Send if: no device filter on connection OR log has no device OR devices match
-                if conn_device_id is None or device_id is None or conn_device_id == device_id:
-                    await connection.send_text(message)
-            except Exception:
-                pass  # Connection may have closed
+                frame = frames[conn_device_id] = "\n".join(
+                    message for message, device_id in entries
+                    if conn_device_id is None or device_id is None or conn_device_id == device_id
+                )
+            if frame:
+                pending.append((connection, frame))
+        await self._send_all(pending)
+
+    async def _send_all(self, pending: List[tuple[WebSocket, str]]):
+        """Send each (connection, text) pair concurrently and drop connections that fail.
+
+        Large fan-outs go out in slices of BROADCAST_BATCH_SIZE, yielding to the
+        event loop in between so HTTP requests aren't starved.
+        """
+        for start in range(0, len(pending), BROADCAST_BATCH_SIZE):
+            if start:
+                await asyncio.sleep(0)
+            chunk = pending[start:start + BROADCAST_BATCH_SIZE]
+            # Send to all clients concurrently so one slow socket doesn't stall the rest
+            results = await asyncio.gather(
+                *(connection.send_text(payload) for connection, payload in chunk),
+                return_exceptions=True,
+            )
+            for (connection, _), result in zip(chunk, results):
+                if isinstance(result, Exception):
+                    self.disconnect(connection)  # Connection closed; stop tracking it
+
+    async def heartbeat(self):
+        """Periodically send an empty frame to every client so dead peers get pruned."""
+        while True:
+            await asyncio.sleep(WS_HEARTBEAT_INTERVAL)
+            await self._send_all([(connection, "") for connection in tuple(self.active_connections)])
 
 manager = ConnectionManager()
 
 # Device-specific log file writing
-def write_device_log(device_id: Optional[str], message: str):
-    """Write log message to device-specific log file.
-    
+def write_device_logs(messages: dict[str, List[str]]):
+    """Append log messages to their device-specific log files, one open per device.
+
+    messages maps device_id -> lines, in order. Does file I/O (and may resolve
+    the Android ID via ADB), so log_broadcaster runs it in a worker thread.
     Log files are stored at: data/devices/{android_id}/logs/YYYY-MM-DD.log
     """
-    if not device_id:
-        return
-    
-    android_id = resolve_android_id(device_id)
-    if not android_id:
-        return
-    
-    try:
-        from datetime import datetime
-        dm = get_device_data_manager()
-        folder = dm.get_device_folder_name(android_id)
-        log_dir = os.path.join(PROJECT_ROOT, "data", "devices", folder, "logs")
-        os.makedirs(log_dir, exist_ok=True)
-        
-        today = datetime.now().strftime("%Y-%m-%d")
-        log_file = os.path.join(log_dir, f"{today}.log")
-        
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(f"[{timestamp}] {message}\n")
-    except Exception as e:
-        print(f"Error writing device log: {e}")
+    now = datetime.now()
+    timestamp = f"[{now:%H:%M:%S}] "
+    for device_id, lines in messages.items():
+        android_id = resolve_android_id(device_id)
+        if not android_id:
+            continue
+
+        try:
+            dm = get_device_data_manager()
+            folder = dm.get_device_folder_name(android_id)
+            log_dir = os.path.join(DEVICES_DIR, folder, "logs")
+            os.makedirs(log_dir, exist_ok=True)
+
+            log_file = os.path.join(log_dir, f"{now:%Y-%m-%d}.log")
+            with open(log_file, "a", encoding="utf-8") as f:
+                f.write("".join(f"{timestamp}{line}\n" for line in lines))
+        except Exception as e:
+            print(f"Error writing device log: {e}")
+
+def parse_log_device_id(msg: str) -> Optional[str]:
+    """Parse device_id from log message if present: [device_id] ..."""
+    if msg.startswith("[") and "]" in msg:
+        bracket_end = msg.index("]")
+        potential_device_id = msg[1:bracket_end]
+        # Check if it looks like a device ID (contains : or .)
+        if ":" in potential_device_id or "." in potential_device_id:
+            return potential_device_id
+    return None
 
 # Background Log Broadcaster
 async def log_broadcaster():
+    global _log_loop, log_queue
+    # asyncio.Queue binds to the loop that first uses it, so start each loop with a fresh one
+    log_queue = asyncio.Queue(maxsize=LOG_QUEUE_MAXSIZE)
+    # Publish the loop and take the backlog atomically: any later publish_log
+    # sees the loop and schedules after these lines
+    with _log_loop_lock:
+        _log_loop = asyncio.get_running_loop()
+        pending = list(_pending_logs)
+        _pending_logs.clear()
+    for line in pending:
+        _enqueue_log(line)
+
     while True:
-        while not log_queue.empty():
-            msg = log_queue.get()
-            # Parse device_id from log message if present: [device_id] ...
-            device_id = None
-            if msg.startswith("[") and "]" in msg:
-                bracket_end = msg.index("]")
-                potential_device_id = msg[1:bracket_end]
-                # Check if it looks like a device ID (contains : or .)
-                if ":" in potential_device_id or "." in potential_device_id:
-                    device_id = potential_device_id
-            
-            # Write to device log file
+        # Sleep until a line arrives, then take what else is already queued (up to LOG_BATCH_MAX)
+        batch = [await log_queue.get()]
+        while not log_queue.empty() and len(batch) < LOG_BATCH_MAX:
+            batch.append(log_queue.get_nowait())
+
+        entries = []
+        device_lines: dict[str, List[str]] = {}
+        for msg in batch:
+            device_id = parse_log_device_id(msg)
             if device_id:
-                write_device_log(device_id, msg)
-            
-            # Broadcast to WebSocket (with device filtering)
-            await manager.broadcast(msg, device_id)
-        await asyncio.sleep(0.1)
+                device_lines.setdefault(device_id, []).append(msg)
+            entries.append((msg, device_id))
+        
+        # Broadcast to WebSocket (with device filtering) first, so delivery never
+        # waits on file appends or an ADB Android ID lookup
+        await manager.broadcast_batch(entries)
+
+        # Write to device log files off the loop; awaiting keeps batches in order
+        if device_lines:
+            await asyncio.to_thread(write_device_logs, device_lines)
 
 @app.on_event("startup")
 async def startup_event():
     asyncio.create_task(log_broadcaster())
     asyncio.create_task(health_checker())
+    asyncio.create_task(manager.heartbeat())
+
+@app.on_event("shutdown")
+def shutdown_event():
+    flush_all_chat_history()
 
 # Device Log APIs
 @app.get("/api/logs/{device_id}")
@@ -300,7 +425,6 @@ def get_device_logs(device_id: str, date: Optional[str] = None):
     Returns:
         Dict with logs content, available dates, and current date.
     """
-    from datetime import datetime, timedelta
     
     android_id = resolve_android_id(device_id)
     if not android_id:
@@ -308,7 +432,7 @@ def get_device_logs(device_id: str, date: Optional[str] = None):
     
     dm = get_device_data_manager()
     folder = dm.get_device_folder_name(android_id)
-    log_dir = os.path.join(PROJECT_ROOT, "data", "devices", folder, "logs")
+    log_dir = os.path.join(DEVICES_DIR, folder, "logs")
     
     # Default to today
     if not date:
@@ -348,26 +472,49 @@ def get_device_logs(device_id: str, date: Optional[str] = None):
     }
 
 # APIs
+# Cache for `adb devices` output; the UI polls this endpoint
+_devices_cache = {"devices": None, "timestamp": 0.0}
+_DEVICES_CACHE_TTL = 2  # seconds
+_devices_lock: Optional[asyncio.Lock] = None  # Created on the serving loop
+
+# Prefer a bundled adb next to the app; resolved once at startup
+_LOCAL_ADB = os.path.join(os.getcwd(), "platform-tools", "adb.exe")
+ADB_CMD = _LOCAL_ADB if os.path.exists(_LOCAL_ADB) else "adb"
+
+def _list_adb_devices() -> List[str]:
+    result = subprocess.run([ADB_CMD, "devices"], capture_output=True, text=True, encoding='utf-8')
+    lines = result.stdout.strip().split("\n")[1:]
+    return [line.split("\t")[0] for line in lines if "\tdevice" in line]
+
+def _cached_devices() -> Optional[List[str]]:
+    cached = _devices_cache["devices"]
+    if cached is not None and time.monotonic() - _devices_cache["timestamp"] < _DEVICES_CACHE_TTL:
+        return cached
+    return None
+
 @app.get("/api/devices")
-def get_devices():
-    # Helper to get devices calling adb directly if imports fail
-    import subprocess
-    import shutil
-    
-    # Check for local adb first
-    local_adb = os.path.join(os.getcwd(), "platform-tools", "adb.exe")
-    if os.path.exists(local_adb):
-        adb_cmd = local_adb
-    else:
-        adb_cmd = "adb"
-        
-    try:
-        result = subprocess.run([adb_cmd, "devices"], capture_output=True, text=True, encoding='utf-8')
-        lines = result.stdout.strip().split("\n")[1:]
-        devices = [line.split("\t")[0] for line in lines if "\tdevice" in line]
+async def get_devices():
+    global _devices_lock
+    cached = _cached_devices()
+    if cached is not None:
+        return {"devices": cached}
+
+    if _devices_lock is None:
+        _devices_lock = asyncio.Lock()
+    # Concurrent pollers share one adb call instead of each forking their own
+    async with _devices_lock:
+        cached = _cached_devices()
+        if cached is not None:
+            return {"devices": cached}
+        try:
+            # A worker thread rather than create_subprocess_exec: the selector loop
+            # uvicorn uses on Windows with --reload can't spawn subprocesses
+            devices = await asyncio.to_thread(_list_adb_devices)
+        except Exception as e:
+            return {"devices": [], "error": str(e)}
+        _devices_cache["devices"] = devices
+        _devices_cache["timestamp"] = time.monotonic()
         return {"devices": devices}
-    except Exception as e:
-        return {"devices": [], "error": str(e)}
 
 # Default Settings and Persistence
 # (Paths moved to top of file)
@@ -382,49 +529,52 @@ CHAT_HISTORY_FILE = os.path.join(PROJECT_ROOT, "chat_history.json")  # Keep for
 
 # File Locks
 history_lock = threading.Lock()
+history_write_lock = threading.Lock()
+
+@lru_cache(maxsize=None)
+def _get_test_messages() -> list:
+    """Text-only messages for model connectivity tests, built on first use.
+
+    We use the 'cn' system prompt as default for testing; the user prompt
+    aligns with the requested output example.
+    """
+    from phone_agent.config import get_system_prompt
+    return [
+        {"role": "system", "content": get_system_prompt("cn")},
+        {"role": "user", "content": "帮我比较一下LUMMI MOOD洗发水在京东和淘宝上的价格，然后选择最便宜的平台下单。"}
+    ]
+
+@lru_cache(maxsize=4)
+def _get_model_client(base_url: str, model_name: str, api_key: str):
+    """Reuse one ModelClient (and its HTTP connection pool) per endpoint and key."""
+    from phone_agent.model import ModelClient, ModelConfig
+    return ModelClient(ModelConfig(base_url=base_url, model_name=model_name, api_key=api_key))
 
-def _perform_model_test(settings: Settings) -> dict:
+_PROXY_ENV_KEYS = ('HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy', 'ALL_PROXY', 'all_proxy')
+
+@lru_cache(maxsize=None)
+def _clear_proxy_env():
+    """Clear proxy env vars (once per process) so they don't conflict with model tests."""
+    for proxy_key in _PROXY_ENV_KEYS:
+        if proxy_key in os.environ:
+            print(f"DEBUG: Found proxy env var {proxy_key}={os.environ[proxy_key]}")
+            print(f"DEBUG: Clearing {proxy_key} to prevent conflict...")
+            os.environ.pop(proxy_key)
+
+def _perform_model_test(mode: str, base_url: str, model_name: str, api_key: str) -> dict:
+    """Send the test prompt to the model selected by mode (cloud or local)."""
     global model_status
     try:
-        from phone_agent.model import ModelClient, ModelConfig
-        from phone_agent.config import get_system_prompt
-        import traceback
-        
-        # Use config from the request settings, respecting the mode
-        print(f"DEBUG: Testing with mode: '{settings.mode}'")
-        
-        # Check and clear proxies if they exist
-        for proxy_key in ['HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy', 'ALL_PROXY', 'all_proxy']:
-            if proxy_key in os.environ:
-                print(f"DEBUG: Found proxy env var {proxy_key}={os.environ[proxy_key]}")
-                print(f"DEBUG: Clearing {proxy_key} to prevent conflict...")
-                os.environ.pop(proxy_key)
-        
-        active_config = settings.cloud if settings.mode == "cloud" else settings.local
-        print(f"DEBUG: Selected active config base_url: '{active_config.base_url}'")
+        print(f"DEBUG: Testing with mode: '{mode}'")
         
-        model_config = ModelConfig(
-            base_url=active_config.base_url,
-            model_name=active_config.model_name,
-            api_key=active_config.api_key
-        )
-        client = ModelClient(model_config)
-        
-        # Construct a simple test message context
-        # We use the 'cn' system prompt as default for testing
-        sys_prompt = get_system_prompt("cn")
+        _clear_proxy_env()
         
-        # User prompt that aligns with the requested output example
-        user_prompt = "帮我比较一下LUMMI MOOD洗发水在京东和淘宝上的价格，然后选择最便宜的平台下单。"
+        print(f"DEBUG: Selected active config base_url: '{base_url}'")
         
-        # Determine message format based on what ModelClient expects (list of dicts)
-        # We'll construct a text-only message for testing connectivity
-        messages = [
-            {"role": "system", "content": sys_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
+        client = _get_model_client(base_url, model_name, api_key)
+        messages = _get_test_messages()
         
-        print(f"Testing model with URL: {active_config.base_url}, Model: {active_config.model_name}")
+        print(f"Testing model with URL: {base_url}, Model: {model_name}")
         response = client.request(messages)
 
         # Update status logic
@@ -449,7 +599,11 @@ def _perform_model_test(settings: Settings) -> dict:
 
 @app.post("/api/test_model")
 def test_model(settings: Settings):
-    return _perform_model_test(settings)
+    # Use config from the request settings, respecting the mode
+    active_config = settings.cloud if settings.mode == "cloud" else settings.local
+    return _perform_model_test(
+        settings.mode, active_config.base_url, active_config.model_name, active_config.api_key
+    )
 
 @app.post("/api/test_connection")
 def test_connection():
@@ -480,26 +634,45 @@ def test_connection():
          return {"status": "error", "result": f"测试失败: 设备 {target_device} 未绑定配置文件。"}
 
     pm = get_profile_manager()
-    profile = pm.get_profile(assigned_profile_name)
+    profile = pm.get_profile_cached(assigned_profile_name)
     if not profile:
         return {"status": "error", "result": f"测试失败: 绑定配置 {assigned_profile_name} 不存在。"}
 
     print(f"Testing connection using profile '{assigned_profile_name}' for device '{target_device}'...")
     
-    # We need to construct a 'Settings' object for _perform_model_test
-    # Convert dataclasses to dicts for Pydantic validation
-    from dataclasses import asdict
-    
-    return _perform_model_test(Settings(
-        mode=profile.mode,
-        cloud=asdict(profile.cloud),
-        local=asdict(profile.local),
-        device_id=target_device
-    ))
+    active_config = profile.cloud if profile.mode == "cloud" else profile.local
+    return _perform_model_test(
+        profile.mode, active_config.base_url, active_config.model_name, active_config.api_key
+    )
 
 # Chat history management
 # Device-specific history only (global history deprecated)
 
+# Parsed history per file path; each file is read at most once per process
+_history_cache: dict[str, list] = {}
+# Pending debounced writes per file path
+_history_flush_timers: dict[str, threading.Timer] = {}
+HISTORY_FLUSH_DELAY = 0.2  # seconds; coalesces back-to-back saves into one write
+
+def _read_history_file(path: str) -> Optional[list]:
+    """Return the cached history for path, reading the file on first use.
+
+    Must be called with history_lock held.
+    """
+    history = _history_cache.get(path)
+    if history is None:
+        try:
+            history = read_json(path)
+            _history_cache[path] = history
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading device history ({path}): {e}")
+    return history
+
+def _default_history() -> list:
+    return [{"role": "assistant", "content": f"您好！我是 AutoGLM。已连接到设备。今天想让我帮您做些什么？"}]
+
 def load_chat_history(device_id: Optional[str] = None):
     """Load chat history for a specific device. Global history is deprecated."""
     if not device_id:
@@ -513,40 +686,97 @@ def load_chat_history(device_id: Optional[str] = None):
         return [{"role": "assistant", "content": f"您好！我是 AutoGLM。无法加载设备 {device_id} 的历史记录 (未识别)。请刷新设备列表。"}]
          
     path = dm.get_chat_history_path(android_id)
-    if os.path.exists(path):
+    with history_lock:
+        history = _read_history_file(path)
+        if history is not None:
+            # Callers append to the result, so hand out a copy
+            return list(history)
+    return _default_history()
+
+def _flush_chat_history(path: str):
+    """Write the cached history for path to disk atomically."""
+    # history_write_lock keeps flushes ordered so an older snapshot never lands last;
+    # history_lock is only held for the snapshot so chat appends aren't blocked on disk I/O
+    with history_write_lock:
+        with history_lock:
+            _history_flush_timers.pop(path, None)
+            history = _history_cache.get(path)
+            if history is None:
+                return
+            snapshot = list(history)
         try:
-            with history_lock:
-                with open(path, "r", encoding="utf-8") as f:
-                    return json.load(f)
+            # Ensure directory exists
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write_json(path, snapshot)
         except Exception as e:
-            print(f"Error loading device history ({device_id}): {e}")
-    return [{"role": "assistant", "content": f"您好！我是 AutoGLM。已连接到设备。今天想让我帮您做些什么？"}]
+            print(f"Error saving chat history: {e}")
+
+def flush_all_chat_history():
+    """Write out every pending debounced history save immediately."""
+    with history_lock:
+        pending = list(_history_flush_timers.items())
+    for path, timer in pending:
+        timer.cancel()
+        _flush_chat_history(path)
+
+def _schedule_history_flush(path: str):
+    """(Re)start the debounce timer for path. Must be called with history_lock held."""
+    timer = _history_flush_timers.pop(path, None)
+    if timer:
+        timer.cancel()
+    timer = threading.Timer(HISTORY_FLUSH_DELAY, _flush_chat_history, args=(path,))
+    _history_flush_timers[path] = timer
+    timer.start()
+
+def _device_history_path(device_id: Optional[str]) -> Optional[str]:
+    if not device_id:
+        print("Warning: chat history change without device_id, skipping save.")
+        return None
+    android_id = resolve_android_id(device_id)
+    if not android_id:
+        print(f"Warning: Skipping history save for unidentified device '{device_id}'")
+        return None
+    return get_device_data_manager().get_chat_history_path(android_id)
 
 def save_chat_history(history, device_id: Optional[str] = None):
-    """Save chat history for a specific device. Global history is deprecated."""
-    if not device_id:
-        print("Warning: save_chat_history called without device_id, skipping save.")
-        return
-        
+    """Save chat history for a specific device. Global history is deprecated.
+
+    The in-memory copy is updated immediately; the file write is debounced.
+    """
     try:
+        path = _device_history_path(device_id)
+        if not path:
+            return
         with history_lock:
-            dm = get_device_data_manager()
-            android_id = resolve_android_id(device_id)
-            if not android_id:
-                print(f"Warning: Skipping history save for unidentified device '{device_id}'")
-                return
-                
-            path = dm.get_chat_history_path(android_id)
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(path), exist_ok=True)
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(history, f, ensure_ascii=False, indent=2)
+            if _read_history_file(path) == history:
+                return  # Unchanged (e.g. clearing an already-clear chat); skip the write
+            _history_cache[path] = list(history)
+            _schedule_history_flush(path)
+    except Exception as e:
+        print(f"Error saving chat history: {e}")
+
+def append_chat_history(device_id: Optional[str], entry: dict):
+    """Append one message to a device's history in place.
+
+    Avoids copying the whole transcript out and back in for every chat turn.
+    """
+    try:
+        path = _device_history_path(device_id)
+        if not path:
+            return
+        with history_lock:
+            history = _read_history_file(path)
+            if history is None:
+                history = _history_cache[path] = _default_history()
+            history.append(entry)
+            _schedule_history_flush(path)
     except Exception as e:
         print(f"Error saving chat history: {e}")
 
 @app.get("/api/history")
 def get_history(device_id: Optional[str] = None):
-    return {"history": load_chat_history(device_id)}
+    # Return a Response directly so FastAPI doesn't run jsonable_encoder over every message
+    return FastJSONResponse({"history": load_chat_history(device_id)})
 
 @app.delete("/api/history")
 def clear_history(device_id: Optional[str] = None):
@@ -565,12 +795,8 @@ def clear_history(device_id: Optional[str] = None):
     return {"status": "success", "history": initial_history}
 
 def get_beijing_time():
-    """Fetch real-time time from local system."""
-    from datetime import datetime
-    try:
-        return datetime.now().strftime("%H:%M")
-    except Exception:
-        return "Time Error"
+    """Current local system time as HH:MM (no network lookup)."""
+    return datetime.now().strftime("%H:%M")
 
 @app.post("/api/stop")
 def stop_agent(force: bool = False):
@@ -589,19 +815,71 @@ def stop_agent(force: bool = False):
 
 from fastapi.responses import StreamingResponse
 
+_STREAM_DONE = object()
+
+def ndjson_line(obj) -> bytes:
+    """Encode one NDJSON line for a streaming response."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+async def stream_from_thread(sync_iter):
+    """Run a blocking iterator in its own thread and yield its items on the event loop.
+
+    Items are handed over through an asyncio.Queue, so a slow model call occupies
+    only this dedicated thread rather than a shared threadpool slot per step.
+    """
+    loop = asyncio.get_running_loop()
+    items: asyncio.Queue = asyncio.Queue()
+
+    def put(item):
+        try:
+            loop.call_soon_threadsafe(items.put_nowait, item)
+        except RuntimeError:
+            pass  # Event loop already closed (shutdown)
+
+    # Set when the consumer goes away (client disconnected) so the producer stops
+    # driving the iterator, as it would have if it were iterated directly
+    cancelled = threading.Event()
+
+    def producer():
+        try:
+            for item in sync_iter:
+                if cancelled.is_set():
+                    break
+                put(item)
+        except BaseException as e:
+            put(e)
+        finally:
+            close = getattr(sync_iter, "close", None)
+            if close is not None:
+                close()
+            put(_STREAM_DONE)
+
+    threading.Thread(target=producer, name="chat-stream", daemon=True).start()
+    try:
+        while True:
+            item = await items.get()
+            if item is _STREAM_DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        cancelled.set()
+
 # Health Check Service
 model_status = "unknown" # unknown, ok, error
 last_health_check = 0
 
 async def health_checker():
     global model_status, last_health_check
-    import time
-    from phone_agent.model import ModelClient, ModelConfig
     
     while True:
         try:
             # Wait before checking (initial delay or interval)
             await asyncio.sleep(60)
+            from phone_agent.model import ModelClient, ModelConfig
 
             # Optimization: Skip check if agent is currently running
             if agent and agent.is_running:
@@ -619,7 +897,7 @@ async def health_checker():
                 pname = dm.get_profile_name(aid)
                 if pname:
                     pm = get_profile_manager()
-                    profile = pm.get_profile(pname)
+                    profile = pm.get_profile_cached(pname)
                     if profile:
                         active_config = profile.cloud if profile.mode == "cloud" else profile.local
                         
@@ -652,10 +930,22 @@ async def health_checker():
         # Ensure we don't loop too tight on error
         await asyncio.sleep(5)
 
-@app.on_event("startup")
-async def startup_event():
-    asyncio.create_task(log_broadcaster())
-    asyncio.create_task(health_checker())
+# list_devices() forks the device CLI and /api/status is polled by every open tab,
+# so reuse the id list briefly; agent/model state is still read live per request
+_status_devices_cache = {"device_ids": None, "timestamp": 0.0}
+_STATUS_DEVICES_TTL = 1.0  # seconds
+
+def _status_device_ids() -> List[str]:
+    cached = _status_devices_cache["device_ids"]
+    now = time.monotonic()
+    if cached is not None and now - _status_devices_cache["timestamp"] < _STATUS_DEVICES_TTL:
+        return cached
+    device_info_list = get_device_factory().list_devices()
+    # Extract device_id strings from DeviceInfo objects
+    device_ids = [d.device_id if hasattr(d, 'device_id') else str(d) for d in device_info_list]
+    _status_devices_cache["device_ids"] = device_ids
+    _status_devices_cache["timestamp"] = now
+    return device_ids
 
 @app.get("/api/status")
 def get_status(device_id: Optional[str] = None):
@@ -679,12 +969,7 @@ def get_status(device_id: Optional[str] = None):
     # Check device connection status
     device_connected = False
     try:
-        from phone_agent.device_factory import get_device_factory
-        device_factory = get_device_factory()
-        device_info_list = device_factory.list_devices()
-        
-        # Extract device_id strings from DeviceInfo objects
-        device_ids = [d.device_id if hasattr(d, 'device_id') else str(d) for d in device_info_list]
+        device_ids = _status_device_ids()
         
         if target_device:
             device_connected = target_device in device_ids
@@ -722,7 +1007,7 @@ def get_status(device_id: Optional[str] = None):
         p_name = dm.get_profile_name(aid)
         if p_name:
             pm = get_profile_manager()
-            profile = pm.get_profile(p_name)
+            profile = pm.get_profile_cached(p_name)
             if profile:
                 mode = profile.mode
                 if profile.agent:
@@ -768,20 +1053,20 @@ def select_folder():
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+# App lists are static module data; sort each once
+_APPS_BY_TYPE = {
+    "adb": tuple(sorted(list_supported_apps())),
+    "hdc": tuple(sorted(list_harmonyos_apps())),
+    "ios": tuple(sorted(list_ios_apps())),
+}
+
 @app.get("/api/apps")
 def get_supported_apps():
     """List supported apps based on current device type."""
     dt = "adb" # Default to Android/ADB for now
     # TODO: Detect device platform dynamically
     
-    if dt == "hdc":
-        apps = list_harmonyos_apps()
-    elif dt == "ios":
-        apps = list_ios_apps()
-    else:
-        apps = list_supported_apps()
-        
-    return {"apps": sorted(apps), "device_type": dt}
+    return {"apps": _APPS_BY_TYPE.get(dt, _APPS_BY_TYPE["adb"]), "device_type": dt}
 
 # ============================================================================
 # Device Info APIs
@@ -794,13 +1079,11 @@ _DEVICE_INFO_CACHE_TTL = 30  # Cache valid for 30 seconds
 
 def get_device_info_via_adb(device_id: str, use_cache: bool = True) -> dict:
     """Get detailed device info via ADB commands."""
-    import subprocess
-    import time as _time
     
     # Check cache first to avoid frequent ADB calls
     if use_cache and device_id in _device_info_cache:
         cached = _device_info_cache[device_id]
-        if _time.time() - cached["timestamp"] < _DEVICE_INFO_CACHE_TTL:
+        if time.time() - cached["timestamp"] < _DEVICE_INFO_CACHE_TTL:
             return cached["info"]
     
     def run_adb_command(cmd_suffix: str) -> str:
@@ -849,10 +1132,9 @@ def get_device_info_via_adb(device_id: str, use_cache: bool = True) -> dict:
             info["android_id"] = "Unknown"
         
         # Update cache
-        import time as _time
         _device_info_cache[device_id] = {
             "info": info,
-            "timestamp": _time.time()
+            "timestamp": time.time()
         }
             
         return info
@@ -893,7 +1175,6 @@ def get_device_info_via_adb(device_id: str, use_cache: bool = True) -> dict:
                             if aid: break
                 except Exception as e:
                     print(f"[Debug] Error listing known devices: {e}")
-                    import traceback
                     traceback.print_exc()
 
             # 3. If we found an Android ID, load its metadata
@@ -946,9 +1227,6 @@ def set_device_profile(device_id: str, request: SetDeviceProfileRequest):
 def get_all_devices_detailed():
     """Get list of all connected devices with detailed info."""
     try:
-        from phone_agent.device_factory import get_device_factory
-        from gui.backend.data_manager import DeviceInfo
-        
         device_factory = get_device_factory()
         device_info_list = device_factory.list_devices()
         dm = get_device_data_manager()
@@ -1011,7 +1289,6 @@ def get_all_devices_detailed():
              
         return {"devices": final_list}
     except Exception as e:
-        import traceback
         return {"devices": [], "error": str(e), "traceback": traceback.format_exc()}
 
 
@@ -1019,11 +1296,6 @@ def get_all_devices_detailed():
 # Profile Management APIs
 # ============================================================================
 
-from gui.backend.data_manager import (
-    get_profile_manager, get_device_data_manager, get_global_settings_manager,
-    Profile, GlobalSettings
-)
-
 @app.get("/api/profiles")
 def list_profiles():
     """List all configuration profiles."""
@@ -1121,7 +1393,8 @@ def rename_profile(name: str, request: RenameProfileRequest):
 def get_global_settings():
     """Get global application settings."""
     gsm = get_global_settings_manager()
-    return gsm.get().to_dict()
+    # Serve the cached encoding directly instead of re-serializing through FastAPI
+    return Response(gsm.get_json(), media_type="application/json")
 
 class UpdateGlobalSettingsRequest(BaseModel):
     last_selected_device: str = ""
@@ -1133,16 +1406,8 @@ class UpdateGlobalSettingsRequest(BaseModel):
 def update_global_settings(request: UpdateGlobalSettingsRequest):
     """Update global settings."""
     gsm = get_global_settings_manager()
-    settings = GlobalSettings(
-        last_selected_device=request.last_selected_device,
-        check_device_on_startup=request.check_device_on_startup,
-        language=request.language,
-        manual_screenshot_path=request.manual_screenshot_path
-    )
+    settings = GlobalSettings(**request.model_dump())
     gsm.save(settings)
-    
-
-    
     return {"status": "success", "settings": settings.to_dict()}
 
 # ADB Control APIs
@@ -1156,7 +1421,6 @@ def get_active_device_id() -> str:
 @app.post("/api/adb/reboot")
 def adb_reboot():
     """Reboot device via ADB in CMD window."""
-    import subprocess
     try:
         device_id = get_active_device_id()
         if not device_id:
@@ -1177,7 +1441,6 @@ def adb_reboot():
 @app.post("/api/adb/install")
 def adb_install():
     """Install APK via ADB."""
-    import subprocess
     try:
         # Open file dialog to select APK
         ps_cmd = """
@@ -1218,9 +1481,6 @@ def adb_install():
 def adb_screenshot_save():
     """Take screenshot and save to local path (from global settings)."""
     try:
-        from phone_agent.device_factory import get_device_factory
-        import base64
-        from datetime import datetime
         
         # Get save path from global settings
         gsm = get_global_settings_manager()
@@ -1254,7 +1514,6 @@ def adb_screenshot_save():
             "path": file_path
         }
     except Exception as e:
-        import traceback
         return {"status": "error", "message": str(e), "traceback": traceback.format_exc()}
 
 @app.get("/api/screenshot/latest")
@@ -1269,29 +1528,25 @@ def get_latest_screenshot(device_id: Optional[str] = None):
     if device_id:
         dm = get_device_data_manager()
         
-        # Resolve Folder Name
-        # 1. Try Cache (IP/Serial -> Android ID)
-        android_id = DEVICE_IP_TO_ANDROID_ID.get(device_id)
-        
-        # 2. If not in cache, maybe device_id IS the android_id? (Offline view)
-        # Check if a folder exists with this name (sanitized)
-        if not android_id:
-             potential_folder = dm.get_device_folder_name(device_id)
-             if os.path.exists(os.path.join(PROJECT_ROOT, "data", "devices", potential_folder)):
-                 android_id = device_id
-        
-        # 3. If we successfully resolved an Android ID (or passed one), use it
-        if android_id:
-            folder = dm.get_device_folder_name(android_id)
-            dev_path = os.path.join(PROJECT_ROOT, "data", "devices", folder, "temp_screenshots", "latest_screenshot.png")
-            
-            if os.path.exists(dev_path):
-                mtime = os.path.getmtime(dev_path)
-                return {
-                    "exists": True,
-                    "url": f"/devices_data/{folder}/temp_screenshots/latest_screenshot.png",
-                    "timestamp": mtime
-                }
+        # Resolve Folder Name: cached IP/Serial -> Android ID, otherwise treat
+        # device_id as the Android ID (offline view). A missing folder simply
+        # fails the stat below, so no separate exists() check is needed.
+        android_id = DEVICE_IP_TO_ANDROID_ID.get(device_id) or device_id
+        folder = dm.get_device_folder_name(android_id)
+        dev_path = os.path.join(DEVICES_DIR, folder, "temp_screenshots", "latest_screenshot.png")
+
+        # The image itself is served by the /devices_data StaticFiles mount
+        # (ETag/Last-Modified); here one stat covers both existence and mtime
+        try:
+            mtime = os.stat(dev_path).st_mtime
+        except OSError:
+            pass
+        else:
+            return {
+                "exists": True,
+                "url": f"/devices_data/{folder}/temp_screenshots/latest_screenshot.png",
+                "timestamp": mtime
+            }
         
         return {
             "exists": False,
@@ -1309,6 +1564,8 @@ def get_latest_screenshot(device_id: Optional[str] = None):
 # Note: Legacy /temp_screenshots/{filename} route removed.
 # Screenshots are now served via /devices_data/{folder}/temp_screenshots/
 
+# Actions worth keeping in chat history (user intervention or results); 'finish' is excluded
+_KEY_ACTIONS = ('Take_over', 'Note', 'Interact')
 
 @app.post("/api/chat")
 def chat(request: ChatRequest):
@@ -1333,7 +1590,7 @@ def chat(request: ChatRequest):
         print(f"Error: No profile assigned to device '{target_device}' (AndroidID: {android_id}).")
         return {"error": f"设备 '{target_device}' 未绑定任何配置文件。请先在设备管理页面选择配置。"}
 
-    profile = pm.get_profile(assigned_profile_name)
+    profile = pm.get_profile_cached(assigned_profile_name)
     if not profile:
         print(f"Error: Assigned profile '{assigned_profile_name}' not found.")
         return {"error": f"设备已绑定配置 '{assigned_profile_name}'，但该配置不存在。请重新选择。"}
@@ -1358,6 +1615,9 @@ def chat(request: ChatRequest):
         print(f"Initializing agent for device {target_device}...")
         try:
             # Determine active config based on mode
+            from phone_agent.agent import PhoneAgent, AgentConfig
+            from phone_agent.model import ModelConfig
+
             active_config = active_settings_source.cloud if active_settings_source.mode == "cloud" else active_settings_source.local
             
             model_config = ModelConfig(
@@ -1384,7 +1644,7 @@ def chat(request: ChatRequest):
             dm = get_device_data_manager()
             # android_id resolved above
             folder = dm.get_device_folder_name(android_id)
-            dev_data_dir = os.path.join(PROJECT_ROOT, "data", "devices", folder, "temp_screenshots")
+            dev_data_dir = os.path.join(DEVICES_DIR, folder, "temp_screenshots")
             os.makedirs(dev_data_dir, exist_ok=True)
 
             agent_conf = AgentConfig(
@@ -1399,18 +1659,14 @@ def chat(request: ChatRequest):
             print(f"Agent init failed: {e}")
             return {"error": f"Failed to initialize agent: {str(e)}"}
     
-    # Load history
-    # Load history for specific device
-    history = load_chat_history(target_device)
     current_time = get_beijing_time()
     
     # Append user message immediately
-    history.append({
+    append_chat_history(target_device, {
         "role": "user", 
         "content": request.message,
         "time": current_time
     })
-    save_chat_history(history) # Save user message first
 
     if request.is_new_task:
         agent.reset()
@@ -1428,50 +1684,55 @@ def chat(request: ChatRequest):
             
             total_tasks = len(tasks)
             is_batch = total_tasks > 1
+            is_looping = request.loop_count > 1
+
+            # Labels are fixed for the whole run; build them once instead of per loop/step
+            task_status = [
+                f"Running {f'Task {i+1}/{total_tasks}' if is_batch else 'Task'}: {task[:20]}..."
+                for i, task in enumerate(tasks)
+            ] if is_batch or is_looping else None
+            device_tag = f"[{target_device}]"
+            thought_prefix = f"{device_tag} [Thought] "
             
-            if is_batch or request.loop_count > 1:
-                loop_info = f" (Loop {request.loop_count} times)" if request.loop_count > 1 else ""
-                yield json.dumps({"type": "status", "content": f"Batch Mode: {total_tasks} tasks queued{loop_info}..."}) + "\n"
+            if task_status:
+                loop_info = f" (Loop {request.loop_count} times)" if is_looping else ""
+                yield ndjson_line({"type": "status", "content": f"Batch Mode: {total_tasks} tasks queued{loop_info}..."})
             else:
-                yield json.dumps({"type": "status", "content": "Initializing..."}) + "\n"
+                yield ndjson_line({"type": "status", "content": "Initializing..."})
             
             # Track start time
-            import time
             start_ts = time.time()
             all_task_outputs = []
             all_actions = []  # Collect all action steps for history
 
             # Log Command
-            log_queue.put(f"[{target_device}] [Command] {request.message}")
+            publish_log(f"[{target_device}] [Command] {request.message}")
 
             for loop_idx in range(request.loop_count):
                 if agent.is_stopping:
                     break
                 
-                loop_prefix = f"[Loop {loop_idx+1}/{request.loop_count}] " if request.loop_count > 1 else ""
+                loop_prefix = f"[Loop {loop_idx+1}/{request.loop_count}] " if is_looping else ""
                 
-                if request.loop_count > 1:
-                     yield json.dumps({"type": "status", "content": f"Starting Loop {loop_idx+1}/{request.loop_count}..."}) + "\n"
+                if is_looping:
+                     yield ndjson_line({"type": "status", "content": f"Starting Loop {loop_idx+1}/{request.loop_count}..."})
 
                 for i, task in enumerate(tasks):
                     if agent.is_stopping:
                         break
                     
-                    if is_batch or request.loop_count > 1:
-                        task_label = f"Task {i+1}/{total_tasks}" if is_batch else "Task"
-                        yield json.dumps({"type": "status", "content": f"{loop_prefix}Running {task_label}: {task[:20]}..."}) + "\n"
+                    if task_status:
+                        yield ndjson_line({"type": "status", "content": loop_prefix + task_status[i]})
                     
                     step_output = ""
                     for step in agent.run_stream(task):
                         # Log thought process if available
-                        if hasattr(step, 'thinking') and step.thinking:
+                        if step.thinking:
                             # Format: [DeviceID] [Thought] content
-                            thought_log = f"[{target_device}] [Thought] {step.thinking}"
-                            log_queue.put(thought_log)
+                            publish_log(thought_prefix + step.thinking)
 
-                        # Ensure fields are serializable
+                        # StepResult.action is already a plain dict (or None)
                         action_desc = step.action
-                        if hasattr(action_desc, 'to_dict'): action_desc = action_desc.to_dict()
                         
                         # Only save KEY actions to history (results, not process)
                         # Key actions: Take_over, finish, Note, Interact (user intervention or final results)
@@ -1483,12 +1744,11 @@ def chat(request: ChatRequest):
                             if action_type == 'finish':
                                 # Log full result to file
                                 finish_msg = action_desc.get('message', '')
-                                log_queue.put(f"[{target_device}] [Result] {finish_msg}")
+                                publish_log(f"{device_tag} [Result] {finish_msg}")
                                 # DO NOT add to all_actions, so it won't be shown in "Execution Steps" UI
                                 pass
                             
-                            key_actions = ['Take_over', 'Note', 'Interact'] # Removed 'finish' from here
-                            if action_type in key_actions:
+                            if action_type in _KEY_ACTIONS:
                                 # Avoid duplicate consecutive actions (same type + same message)
                                 is_duplicate = False
                                 if all_actions:
@@ -1504,7 +1764,7 @@ def chat(request: ChatRequest):
                             
                             # Log action execution status (always, regardless of verbose setting)
                             # Format: [DeviceID] [ActionType] details
-                            log_parts = [f"[{target_device}]", f"[{action_type}]"]
+                            log_parts = [device_tag, f"[{action_type}]"]
                             if action_desc.get('element'):
                                 log_parts.append(f"坐标:{action_desc['element']}")
                             if action_desc.get('app'):
@@ -1521,15 +1781,15 @@ def chat(request: ChatRequest):
                                 log_parts.append(f"消息:{msg}")
                             
                             log_line = " ".join(log_parts)
-                            log_queue.put(log_line)
+                            publish_log(log_line)
                         
-                        yield json.dumps({
+                        yield ndjson_line({
                             "type": "step",
                             "thinking": step.thinking,
                             "action": action_desc,
                             "finished": step.finished,
                             "message": step.message
-                        }) + "\n"
+                        })
                         
                         if step.message:
                             step_output = step.message
@@ -1538,8 +1798,8 @@ def chat(request: ChatRequest):
                     if not step_output:
                         step_output = "Done"
                     
-                    output_label = f"Loop {loop_idx+1} Task {i+1}" if request.loop_count > 1 and is_batch else \
-                                   f"Loop {loop_idx+1}" if request.loop_count > 1 else \
+                    output_label = f"Loop {loop_idx+1} Task {i+1}" if is_looping and is_batch else \
+                                   f"Loop {loop_idx+1}" if is_looping else \
                                    f"Task {i+1}" if is_batch else None
                                    
                     if output_label:
@@ -1566,34 +1826,32 @@ def chat(request: ChatRequest):
                 duration_str = f"{m}m {s}s"
             
             # Save Assistant Response with actions
-            history.append({
+            append_chat_history(target_device, {
                 "role": "assistant", 
                 "content": final_content,
                 "time": response_time,
                 "duration": duration_str,
                 "actions": all_actions  # Save all action steps
             })
-            save_chat_history(history, target_device)
             
-            yield json.dumps({
+            yield ndjson_line({
                 "type": "done", 
                 "content": final_content, 
                 "time": response_time,
                 "duration": duration_str
-            }) + "\n"
+            })
 
         except Exception as e:
             error_msg = f"Error: {str(e)}"
-            yield json.dumps({"type": "error", "content": error_msg}) + "\n"
+            yield ndjson_line({"type": "error", "content": error_msg})
             
-            history.append({
+            append_chat_history(target_device, {
                 "role": "assistant", 
                 "content": error_msg,
                 "time": get_beijing_time()
             })
-            save_chat_history(history, target_device)
 
-    return StreamingResponse(generate_response(), media_type="application/x-ndjson")
+    return StreamingResponse(stream_from_thread(generate_response()), media_type="application/x-ndjson")
 
 @app.websocket("/ws/logs")
 async def websocket_logs(websocket: WebSocket, device_id: Optional[str] = None):
@@ -1605,9 +1863,14 @@ async def websocket_logs(websocket: WebSocket, device_id: Optional[str] = None):
     
     await manager.connect(websocket, device_id)
     try:
+        # Clients never send anything; just wait for the close frame
         while True:
-            await websocket.receive_text()  # Keep connection open
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
 
 if __name__ == "__main__":
@@ -209,13 +209,15 @@ export default function ChatView() {
         const ws = new WebSocket(`${protocol}//${window.location.host}/ws/logs`)
 
         ws.onmessage = (event) => {
-            const msg = event.data
-            // Filter out HTTP request logs to reduce noise
-            if (msg && !msg.includes("HTTP/1.1") && !msg.includes("WebSocket")) {
-                // Determine if we should show this log
-                // Preference: Show agent prompts or actions
-                // Add to log buffer
-                addLogLine(msg)
+            // A frame may carry several newline-joined log lines
+            for (const msg of String(event.data).split('\n')) {
+                // Filter out HTTP request logs to reduce noise
+                if (msg && !msg.includes("HTTP/1.1") && !msg.includes("WebSocket")) {
+                    // Determine if we should show this log
+                    // Preference: Show agent prompts or actions
+                    // Add to log buffer
+                    addLogLine(msg)
+                }
             }
         }
 
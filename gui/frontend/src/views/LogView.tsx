@@ -60,11 +60,16 @@ export default function LogView() {
         wsRef.current = ws
 
         ws.onmessage = (event: MessageEvent) => {
+            // Empty frames are server keepalives
+            if (!event.data) return
+            // A frame may carry several newline-joined log lines
+            const lines: string[] = event.data.split('\n')
             // Only append real-time logs if viewing today
             setLogs(prev => {
                 // Prevent duplicates from WebSocket replay
-                if (prev[prev.length - 1] === event.data) return prev
-                return [...prev.slice(-1000), event.data]
+                const fresh = lines.filter((line, i) => line !== (i === 0 ? prev[prev.length - 1] : lines[i - 1]))
+                if (fresh.length === 0) return prev
+                return [...prev, ...fresh].slice(-1001)
             })
         }
 
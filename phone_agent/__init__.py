@@ -5,8 +5,25 @@ This package provides tools for automating Android and iOS phone interactions
 using AI models for visual understanding and decision making.
 """
 
-from phone_agent.agent import PhoneAgent
-from phone_agent.agent_ios import IOSPhoneAgent
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from phone_agent.agent import PhoneAgent
+    from phone_agent.agent_ios import IOSPhoneAgent
 
 __version__ = "0.1.0"
 __all__ = ["PhoneAgent", "IOSPhoneAgent"]
+
+
+def __getattr__(name: str):
+    # Import the agents on first access so that importing a lightweight
+    # submodule (e.g. phone_agent.config) doesn't pull in the model client.
+    if name == "PhoneAgent":
+        from phone_agent.agent import PhoneAgent
+
+        return PhoneAgent
+    if name == "IOSPhoneAgent":
+        from phone_agent.agent_ios import IOSPhoneAgent
+
+        return IOSPhoneAgent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")